@@ -3,12 +3,26 @@ matplotlib.use("Agg")
 from flask import Flask, render_template, request, redirect, url_for
 import matplotlib.pyplot as plt
 import io
+import os
 import base64
 from arquivo_scraper import analyze_search_term
-from claude_insights import generate_insights  # Import the Claude insights function
+from claude_insights import generate_insights_with_status, claude_available  # Import the Claude insights functions
+from prewarm_scheduler import PrewarmScheduler
 
 app = Flask(__name__)
 
+# Search settings
+START_YEAR = 2000
+MAX_RESULTS = 300
+
+# Pre-warming settings
+TRACKED_TERMS = []              # Terms that are always kept warm, e.g. ["Euro 2004"]
+PREWARM_MAX_CONCURRENCY = 2     # Terms refreshed in parallel
+ARQUIVO_REQUESTS_PER_MINUTE = 30   # Per process, and only for background refreshes
+FALLBACK_CACHE_TTL = 30 * 60    # Seconds results are cached when the Claude call failed
+
+DEBUG = True
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     if request.method == "POST":
@@ -18,23 +32,35 @@ def index():
         return redirect(url_for("chart", term=user_input))
     return render_template("index.html")
 
-@app.route("/chart")
-def chart():
-    term = request.args.get("term", "")
-    if not term:
-        return redirect(url_for("index"))
+def build_chart_context(term, before_request=None):
+    """
+    Fetch results and generate insights for a search term
     
+    Parameters:
+    -----------
+    term : str
+        The term to search for
+    before_request : callable, optional
+        Called before every request to arquivo.pt, e.g. to apply a rate limit
+        
+    Returns:
+    --------
+    tuple
+        (context, ttl) where context holds the chart.html template variables and
+        ttl the seconds it may be cached: None for the default, 0 if the results
+        are incomplete and must not be cached
+    """
     try:
         # Get analysis results from arquivo.pt
-        results = analyze_search_term(term, start_year=2000, max_results=300)
+        results = analyze_search_term(term, start_year=START_YEAR, max_results=MAX_RESULTS,
+                                      before_request=before_request)
         
         # Check if we have an error
         if results.get('error'):
-            return render_template("chart.html", 
-                                  year_chart_url=None, 
-                                  month_chart_url=None,
-                                  term=term, 
-                                  error=results['error'])
+            return dict(year_chart_url=None, 
+                        month_chart_url=None,
+                        term=term, 
+                        error=results['error']), 0
         
         # Extract chart URLs
         year_chart_url = results.get('year_chart')
@@ -46,10 +72,10 @@ def chart():
         total_results = results.get('total_results', 0)
         
         # Generate AI insights using Claude with content snippets
-        ai_insights = generate_insights(term, peak_months, total_results, peak_data)
+        ai_insights, used_claude = generate_insights_with_status(term, peak_months, total_results, peak_data)
         
         # If Claude API fails or returns empty insights, fall back to basic insights
-        if not ai_insights or ai_insights[0].startswith("Claude API integration is not configured") or ai_insights[0].startswith("Unable to generate AI insights"):
+        if not used_claude or not ai_insights:
             # Simple insights based on peak data
             insights = []
             if peak_months:
@@ -75,20 +101,60 @@ def chart():
             insights = ai_insights
             ai_powered = True
         
-        return render_template("chart.html", 
-                              year_chart_url=year_chart_url,
-                              month_chart_url=month_chart_url, 
-                              term=term, 
-                              insights=insights,
-                              total_results=total_results,
-                              ai_powered=ai_powered)  # Flag to indicate AI-powered insights
+        context = dict(year_chart_url=year_chart_url,
+                       month_chart_url=month_chart_url, 
+                       term=term, 
+                       insights=insights,
+                       total_results=total_results,
+                       ai_powered=ai_powered)  # Flag to indicate AI-powered insights
+        
+        # Don't cache results with missing pages; retry Claude sooner if the call failed.
+        # Without a configured key retrying gains nothing, so those use the normal TTL
+        if results.get('failed_pages', 0) > 0:
+            return context, 0
+        if not used_claude and claude_available():
+            return context, FALLBACK_CACHE_TTL
+        return context, None
         
     except Exception as e:
-        return render_template("chart.html", 
-                              year_chart_url=None,
-                              month_chart_url=None, 
-                              term=term, 
-                              error=str(e))
+        return dict(year_chart_url=None,
+                    month_chart_url=None, 
+                    term=term, 
+                    error=str(e)), 0
+
+# Keeps tracked and trending terms warm so popular searches skip arquivo.pt and Claude.
+# Each process runs its own scheduler with its own cache and rate limit, so serve the
+# app with a single worker process to keep ARQUIVO_REQUESTS_PER_MINUTE accurate
+scheduler = PrewarmScheduler(build_chart_context,
+                             tracked_terms=TRACKED_TERMS,
+                             max_concurrency=PREWARM_MAX_CONCURRENCY,
+                             arquivo_requests_per_minute=ARQUIVO_REQUESTS_PER_MINUTE)
+
+@app.before_request
+def start_prewarm_scheduler():
+    # Covers `flask run` and WSGI servers, where the __main__ block below never runs
+    scheduler.start()
+
+@app.route("/chart")
+def chart():
+    term = request.args.get("term", "").strip()
+    if not term:
+        return redirect(url_for("index"))
+    
+    scheduler.record_request(term)
+    
+    # Serve pre-warmed results if we have them. Cache misses are not rate limited,
+    # so users never wait behind background refreshes
+    context = scheduler.get(term)
+    if context is None:
+        context, ttl = build_chart_context(scheduler.display_term(term))
+        scheduler.put(term, context, ttl)
+    
+    # Cached entries are shared between spellings of a term, so show the one typed
+    return render_template("chart.html", **dict(context, term=term))
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # With the debug reloader this block runs twice; only start the scheduler in the serving process
+    if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        scheduler.start()
+    app.run(debug=DEBUG)
\ No newline at end of file
@@ -1,4 +1,5 @@
 import requests
+import threading
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib as mpl
@@ -8,7 +9,13 @@ import base64
 import numpy as np
 from matplotlib.ticker import MaxNLocator
 
-def fetch_arquivo_data(term, start_year=2000, max_results=1000, items_per_site=50):
+# Maximum items allowed per request
+MAX_ITEMS_PER_REQUEST = 100
+
+# pyplot keeps global state (style, current figure), so charts are rendered one at a time
+CHART_LOCK = threading.Lock()
+
+def fetch_arquivo_data(term, start_year=2000, max_results=1000, items_per_site=50, before_request=None):
     """
     Fetch data from Arquivo.pt for a given search term
     
@@ -22,30 +29,34 @@ def fetch_arquivo_data(term, start_year=2000, max_results=1000, items_per_site=5
         Maximum number of results to fetch
     items_per_site : int
         Maximum number of items to return per site
+    before_request : callable, optional
+        Called before every request to arquivo.pt, e.g. to apply a rate limit
         
     Returns:
     --------
     pandas.DataFrame
-        DataFrame containing the search results
+        DataFrame containing the search results; df.attrs['failed_pages'] holds
+        the number of pages that could not be fetched
     """
-    # Maximum items allowed per request
-    max_items_per_request = 100
-    
     # Create URLs for API requests with pagination
     all_urls = []
     
     # Generate paginated URLs
-    for offset in range(0, max_results, max_items_per_request):
+    for offset in range(0, max_results, MAX_ITEMS_PER_REQUEST):
         all_urls.append(
-            f'https://arquivo.pt/textsearch?q={term}&maxItems={max_items_per_request}&offset={offset}'
+            f'https://arquivo.pt/textsearch?q={term}&maxItems={MAX_ITEMS_PER_REQUEST}&offset={offset}'
             f'&prettyPrint=false&dedupValue={items_per_site}&from={start_year}'
         )
     
     # Process all URLs and collect results
     all_items = []
+    failed_pages = 0
     
     for url in all_urls:
         try:
+            if before_request is not None:
+                before_request()
+            
             # Fetch data from URL
             response = requests.get(url)
             response.raise_for_status()
@@ -60,13 +71,16 @@ def fetch_arquivo_data(term, start_year=2000, max_results=1000, items_per_site=5
                 
         except Exception as e:
             print(f"Error fetching {url[:50]}...: {str(e)}")
+            failed_pages += 1
     
     # Convert to DataFrame if we have data
     if all_items:
         df = pd.DataFrame(all_items)
-        return df
     else:
-        return pd.DataFrame()  # Return empty DataFrame if no results
+        df = pd.DataFrame()  # Return empty DataFrame if no results
+    
+    df.attrs['failed_pages'] = failed_pages
+    return df
 
 def parse_tstamp(ts):
     """Convert arquivo.pt timestamp format to datetime, with error handling"""
@@ -136,6 +150,7 @@ def create_visualizations(df, term):
         return result
     
     # Generate month chart with enhanced styling
+    CHART_LOCK.acquire()
     try:
         # Extract yearmonth for grouping
         df['yearmonth'] = df['datetime'].dt.strftime('%Y-%m')
@@ -265,16 +280,18 @@ def create_visualizations(df, term):
             result['peak_months'] = peak_months
         
         # Enhance overall appearance
-        plt.tight_layout()
+        fig.tight_layout()
         
         # Save high-quality figure
         buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
+        fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
         buf.seek(0)
         result['month_chart'] = base64.b64encode(buf.getvalue()).decode('utf-8')
-        plt.close()
+        plt.close(fig)
     except Exception as e:
         print(f"Error creating month chart: {str(e)}")
+    finally:
+        CHART_LOCK.release()
     
     # # Generate year chart with similar enhancements
     # try:
@@ -371,7 +388,7 @@ def create_visualizations(df, term):
     
     return result
 
-def analyze_search_term(term, start_year=2000, max_results=1000):
+def analyze_search_term(term, start_year=2000, max_results=1000, before_request=None):
     """
     Main function to fetch data and create visualizations for a search term
     
@@ -383,6 +400,8 @@ def analyze_search_term(term, start_year=2000, max_results=1000):
         The year to start searching from
     max_results : int
         Maximum number of results to fetch
+    before_request : callable, optional
+        Called before every request to arquivo.pt, e.g. to apply a rate limit
         
     Returns:
     --------
@@ -391,7 +410,8 @@ def analyze_search_term(term, start_year=2000, max_results=1000):
     """
     try:
         # Fetch data from Arquivo.pt
-        df = fetch_arquivo_data(term, start_year, max_results)
+        df = fetch_arquivo_data(term, start_year, max_results, before_request=before_request)
+        failed_pages = df.attrs.get('failed_pages', 0)
         
         if len(df) == 0:
             return {
@@ -400,11 +420,14 @@ def analyze_search_term(term, start_year=2000, max_results=1000):
                 'peak_months': {},
                 'peak_data': {},
                 'total_results': 0,
+                'failed_pages': failed_pages,
                 'error': "No results found for this search term."
             }
         
         # Create visualizations
-        return create_visualizations(df, term)
+        result = create_visualizations(df, term)
+        result['failed_pages'] = failed_pages
+        return result
     except Exception as e:
         return {
             'year_chart': None,
@@ -19,11 +19,20 @@ except ImportError:
     print("Warning: python-dotenv module not found. Will try to use environment variables directly.")
 
 # Get Claude API key from environment variables
-CLAUDE_API_KEY = "PLACE YOUR API KEY HERE"
+CLAUDE_API_KEY_PLACEHOLDER = "PLACE YOUR API KEY HERE"
+CLAUDE_API_KEY = CLAUDE_API_KEY_PLACEHOLDER
 
 # Uncomment and replace with your actual API key if needed
 # CLAUDE_API_KEY = "sk-ant-REDACTED"
 
+def claude_available():
+    """Check whether the Claude API is configured or insights fall back to basic ones."""
+    return bool(ANTHROPIC_AVAILABLE and CLAUDE_API_KEY and not (
+        CLAUDE_API_KEY == CLAUDE_API_KEY_PLACEHOLDER or
+        CLAUDE_API_KEY.startswith("Claude API integration") or 
+        CLAUDE_API_KEY.startswith("Unable to generate")
+    ))
+
 def generate_insights(term, peak_months, total_results, peak_data=None):
     """
     Generate concise insights about why a search term was popular during specific time periods.
@@ -44,15 +53,22 @@ def generate_insights(term, peak_months, total_results, peak_data=None):
     list
         List of insights generated
     """
-    # Check if we're using Claude API or falling back to basic insights
-    use_claude = ANTHROPIC_AVAILABLE and CLAUDE_API_KEY and not (
-        CLAUDE_API_KEY.startswith("Claude API integration") or 
-        CLAUDE_API_KEY.startswith("Unable to generate")
-    )
+    insights, _ = generate_insights_with_status(term, peak_months, total_results, peak_data)
+    return insights
+
+def generate_insights_with_status(term, peak_months, total_results, peak_data=None):
+    """
+    Generate insights like generate_insights and report whether Claude produced them.
     
+    Returns:
+    --------
+    tuple
+        (insights, used_claude) where used_claude is False if basic insights were
+        returned because Claude is not configured or the API call failed
+    """
     # If we can't use Claude, generate basic insights
-    if not use_claude:
-        return generate_basic_insights(term, peak_months, total_results)
+    if not claude_available():
+        return generate_basic_insights(term, peak_months, total_results), False
     
     # Otherwise, try to use Claude for better insights
     try:
@@ -60,11 +76,11 @@ def generate_insights(term, peak_months, total_results, peak_data=None):
         insight = generate_claude_insights(term, peak_months, total_results, peak_data)
         
         # Return it as a single-item list (for compatibility with the template)
-        return [insight]
+        return [insight], True
     except Exception as e:
         print(f"Error calling Claude API: {str(e)}")
         # Fall back to basic insights if Claude fails
-        return generate_basic_insights(term, peak_months, total_results)
+        return generate_basic_insights(term, peak_months, total_results), False
 
 def generate_basic_insights(term, peak_months, total_results):
     """Generate simple statistical insights without requiring Claude API."""
@@ -0,0 +1,360 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Default scheduler settings
+DEFAULT_TOP_N = 10                      # Most-requested /chart terms to keep warm
+DEFAULT_REFRESH_INTERVAL = 6 * 3600     # Seconds before a cached term is refreshed
+DEFAULT_CACHE_TTL = 24 * 3600           # Seconds a cached term may be served
+DEFAULT_RETRY_BACKOFF = 6 * 3600        # Seconds before a failed term is retried
+DEFAULT_MAX_ENTRIES = 100               # Maximum number of cached terms
+DEFAULT_MAX_COUNTED_TERMS = 1000        # Maximum number of distinct terms counted
+DEFAULT_DECAY_INTERVAL = 24 * 3600      # Seconds between halving the request counts
+DEFAULT_OFF_PEAK_HOURS = (1, 6)         # Local hours [start, end) for pre-warming
+DEFAULT_MAX_CONCURRENCY = 2             # Terms refreshed in parallel
+DEFAULT_ARQUIVO_REQUESTS_PER_MINUTE = 30
+DEFAULT_CHECK_INTERVAL = 300            # Seconds between scheduler passes
+
+
+def normalize_term(term):
+    """Normalise a search term so that differently typed requests share one entry"""
+    return " ".join(term.split()).casefold()
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how many requests are sent to arquivo.pt.
+
+    Parameters:
+    -----------
+    requests_per_minute : int
+        Sustained number of requests allowed per minute
+    burst : int
+        Maximum number of requests that may be sent back to back
+    """
+
+    def __init__(self, requests_per_minute, burst=1):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be greater than 0")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, cost=1):
+        """Block until `cost` requests may be sent"""
+        # A single acquire can never need more than a full bucket
+        cost = min(cost, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+
+                wait = (cost - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class PrewarmScheduler:
+    """
+    Keeps the chart results of tracked and trending terms warm in memory.
+
+    The scheduler caches the rendered chart context for each term and, during
+    off-peak hours, refreshes the tracked terms plus the most-requested terms
+    from /chart traffic in the background. Tracked and trending terms are never
+    evicted to make room for other cached terms, and keep being served after
+    their TTL until a refresh replaces them.
+
+    Terms are cached and counted by their normalised form, but refreshed using
+    the first spelling seen for them, so insights read like what users typed.
+
+    Parameters:
+    -----------
+    build_fn : callable
+        Function called as build_fn(term, before_request=...) returning a
+        (context, ttl) tuple, where context is the chart context to cache and
+        ttl the seconds it may be cached (None for cache_ttl, 0 to not cache it).
+        before_request must be called before every request to arquivo.pt
+    tracked_terms : list, optional
+        Terms that are always kept warm
+    top_n : int
+        Number of most-requested terms to keep warm
+    refresh_interval : int
+        Seconds after which a cached term is refreshed
+    cache_ttl : int
+        Default seconds after which a cached term is no longer served
+    retry_backoff : int
+        Seconds before a term whose refresh failed is retried
+    max_entries : int
+        Maximum number of cached terms, not counting tracked and trending terms
+    max_counted_terms : int
+        Maximum number of distinct terms whose requests are counted
+    decay_interval : int
+        Seconds between halving the request counts, so trending follows recent traffic
+    off_peak_hours : tuple
+        Local (start, end) hours during which pre-warming runs; may wrap midnight
+    max_concurrency : int
+        Maximum number of terms refreshed in parallel
+    arquivo_requests_per_minute : int
+        Rate limit for requests sent to arquivo.pt by the scheduler
+    check_interval : int
+        Seconds between scheduler passes
+    """
+
+    def __init__(self, build_fn, tracked_terms=None, top_n=DEFAULT_TOP_N,
+                 refresh_interval=DEFAULT_REFRESH_INTERVAL, cache_ttl=DEFAULT_CACHE_TTL,
+                 retry_backoff=DEFAULT_RETRY_BACKOFF, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_counted_terms=DEFAULT_MAX_COUNTED_TERMS,
+                 decay_interval=DEFAULT_DECAY_INTERVAL, off_peak_hours=DEFAULT_OFF_PEAK_HOURS,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 arquivo_requests_per_minute=DEFAULT_ARQUIVO_REQUESTS_PER_MINUTE,
+                 check_interval=DEFAULT_CHECK_INTERVAL):
+        self.build_fn = build_fn
+        self.tracked_terms = set()
+        self.display_terms = {}         # term -> first spelling seen
+        for term in tracked_terms or []:
+            self.tracked_terms.add(normalize_term(term))
+            self.display_terms.setdefault(normalize_term(term), term.strip())
+        self.top_n = top_n
+        self.refresh_interval = refresh_interval
+        self.cache_ttl = cache_ttl
+        self.retry_backoff = retry_backoff
+        self.max_entries = max_entries
+        self.max_counted_terms = max_counted_terms
+        self.decay_interval = decay_interval
+        self.off_peak_hours = off_peak_hours
+        self.max_concurrency = max_concurrency
+        self.check_interval = check_interval
+        self.rate_limiter = RateLimiter(arquivo_requests_per_minute, burst=max_concurrency)
+
+        self.cache = OrderedDict()      # term -> (timestamp, ttl, context)
+        self.request_counts = Counter()
+        self.failed_at = {}             # term -> timestamp of the last failed refresh
+        self.in_flight = set()
+        self.last_decay = time.time()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def track(self, term):
+        """Add a term that should always be kept warm"""
+        key = normalize_term(term)
+        with self.lock:
+            self.tracked_terms.add(key)
+            self.display_terms.setdefault(key, term.strip())
+
+    def display_term(self, term):
+        """Return the spelling used to build results for a term"""
+        key = normalize_term(term)
+        with self.lock:
+            return self.display_terms.get(key, term.strip())
+
+    def record_request(self, term):
+        """Count a /chart request for a term"""
+        key = normalize_term(term)
+        with self.lock:
+            self.request_counts[key] += 1
+            self.display_terms.setdefault(key, term.strip())
+            # Forget the rarely requested terms once too many are counted
+            if len(self.request_counts) > self.max_counted_terms:
+                self.request_counts = Counter(
+                    dict(self.request_counts.most_common(self.max_counted_terms // 2))
+                )
+                self._prune_display_terms()
+
+    def _prune_display_terms(self):
+        self.display_terms = {
+            key: term for key, term in self.display_terms.items()
+            if key in self.request_counts or key in self.tracked_terms
+        }
+
+    def decay_counts(self):
+        """Halve all request counts, dropping terms that reach zero"""
+        with self.lock:
+            self.request_counts = Counter(
+                {term: count // 2 for term, count in self.request_counts.items() if count // 2 > 0}
+            )
+            self._prune_display_terms()
+            self.last_decay = time.time()
+
+    def _trending_terms(self):
+        return [term for term, _ in self.request_counts.most_common(self.top_n)]
+
+    def trending_terms(self):
+        """Return the most-requested terms"""
+        with self.lock:
+            return self._trending_terms()
+
+    def _managed_terms(self):
+        return self.tracked_terms.union(self._trending_terms())
+
+    def get(self, term):
+        """
+        Return the cached chart context for a term, or None if it is missing or expired.
+
+        Expired entries of tracked and trending terms are still returned until a refresh
+        replaces them.
+        """
+        key = normalize_term(term)
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                return None
+
+            timestamp, ttl, context = entry
+            if time.time() - timestamp > ttl and key not in self._managed_terms():
+                del self.cache[key]
+                return None
+
+            self.cache.move_to_end(key)
+            return context
+
+    def put(self, term, context, ttl=None):
+        """
+        Store the chart context for a term, evicting the least recently used terms.
+
+        Tracked and trending terms are never evicted. A ttl of 0 leaves the cache untouched.
+        """
+        if ttl is None:
+            ttl = self.cache_ttl
+        if ttl <= 0:
+            return
+
+        key = normalize_term(term)
+        with self.lock:
+            self.cache[key] = (time.time(), ttl, context)
+            self.cache.move_to_end(key)
+
+            if len(self.cache) <= self.max_entries:
+                return
+
+            managed = self._managed_terms()
+            for old_key in list(self.cache):
+                if len(self.cache) <= self.max_entries:
+                    break
+                if old_key not in managed and old_key != key:
+                    del self.cache[old_key]
+
+    def is_off_peak(self, now=None):
+        """Check whether the current local hour falls in the off-peak window"""
+        hour = (now or datetime.now()).hour
+        start, end = self.off_peak_hours
+        if start <= end:
+            return start <= hour < end
+        # Window wraps around midnight, e.g. (22, 6)
+        return hour >= start or hour < end
+
+    def terms_to_refresh(self):
+        """Return tracked and trending terms whose cached results are missing or stale"""
+        now = time.time()
+
+        stale = []
+        with self.lock:
+            candidates = list(self.tracked_terms) + self._trending_terms()
+            candidates = list(dict.fromkeys(candidates))  # Deduplicate, keep order
+
+            # Only remember failures of terms we still manage
+            self.failed_at = {term: ts for term, ts in self.failed_at.items() if term in candidates}
+
+            for term in candidates:
+                if term in self.in_flight:
+                    continue
+                if now - self.failed_at.get(term, float("-inf")) < self.retry_backoff:
+                    continue
+                entry = self.cache.get(term)
+                if entry is None or now - entry[0] >= min(self.refresh_interval, entry[1]):
+                    stale.append(term)
+        return stale
+
+    def refresh(self, term):
+        """Rebuild and cache the chart context for a single term"""
+        key = normalize_term(term)
+        with self.lock:
+            if key in self.in_flight:
+                return False
+            self.in_flight.add(key)
+            display_term = self.display_terms.get(key, term.strip())
+
+        try:
+            context, ttl = self.build_fn(display_term, before_request=self.rate_limiter.acquire)
+            if ttl == 0:
+                print(f"Skipped caching '{display_term}': {context.get('error')}")
+                ok = False
+            else:
+                self.put(key, context, ttl)
+                print(f"Pre-warmed results for '{display_term}'")
+                ok = True
+        except Exception as e:
+            print(f"Error pre-warming '{display_term}': {str(e)}")
+            ok = False
+
+        with self.lock:
+            self.in_flight.discard(key)
+            if ok:
+                self.failed_at.pop(key, None)
+            else:
+                self.failed_at[key] = time.time()
+        return ok
+
+    def run_once(self, force=False):
+        """
+        Refresh all stale terms, respecting the concurrency budget.
+
+        Parameters:
+        -----------
+        force : bool
+            Refresh even outside the off-peak window
+
+        Returns:
+        --------
+        int
+            Number of terms refreshed successfully
+        """
+        if time.time() - self.last_decay >= self.decay_interval:
+            self.decay_counts()
+
+        if not force and not self.is_off_peak():
+            return 0
+
+        terms = self.terms_to_refresh()
+        if not terms:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            results = list(executor.map(self.refresh, terms))
+        return sum(results)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error in pre-warm scheduler: {str(e)}")
+            self.stop_event.wait(self.check_interval)
+
+    def start(self):
+        """Start the scheduler in a background daemon thread, unless it is already running"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="prewarm-scheduler", daemon=True)
+            self.thread.start()
+        start, end = self.off_peak_hours
+        print(f"Pre-warm scheduler started (off-peak hours {start:02d}:00-{end:02d}:00)")
+
+    def stop(self):
+        """Stop the background scheduler"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
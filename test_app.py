@@ -0,0 +1,105 @@
+import pytest
+
+import app
+from prewarm_scheduler import PrewarmScheduler
+
+
+RESULTS = {
+    'year_chart': None,
+    'month_chart': "chart",
+    'peak_months': {1: {'date': "June 2004", 'count': 12, 'yearmonth': "2004-06"}},
+    'peak_data': {},
+    'total_results': 40,
+    'failed_pages': 0,
+    'error': None,
+}
+
+
+def patch_analysis(monkeypatch, results=None, used_claude=True, configured=True):
+    calls = []
+
+    def analyze(term, start_year=2000, max_results=1000, before_request=None):
+        calls.append((term, before_request))
+        return dict(RESULTS, **(results or {}))
+
+    def insights(term, peak_months, total_results, peak_data=None):
+        if used_claude:
+            return ["Claude insight"], True
+        return ["Basic insight"], False
+
+    monkeypatch.setattr(app, "analyze_search_term", analyze)
+    monkeypatch.setattr(app, "generate_insights_with_status", insights)
+    monkeypatch.setattr(app, "claude_available", lambda: configured)
+    return calls
+
+
+def test_build_chart_context_caches_claude_insights_with_default_ttl(monkeypatch):
+    patch_analysis(monkeypatch)
+    context, ttl = app.build_chart_context("Euro 2004")
+    assert ttl is None
+    assert context['ai_powered'] is True
+    assert context['insights'] == ["Claude insight"]
+
+
+def test_build_chart_context_does_not_cache_errors(monkeypatch):
+    patch_analysis(monkeypatch, results={'error': "No results found for this search term."})
+    context, ttl = app.build_chart_context("Euro 2004")
+    assert ttl == 0
+    assert context['error'] == "No results found for this search term."
+
+
+def test_build_chart_context_does_not_cache_incomplete_fetches(monkeypatch):
+    patch_analysis(monkeypatch, results={'failed_pages': 1})
+    _, ttl = app.build_chart_context("Euro 2004")
+    assert ttl == 0
+
+
+def test_build_chart_context_retries_failed_claude_call_sooner(monkeypatch):
+    patch_analysis(monkeypatch, used_claude=False, configured=True)
+    context, ttl = app.build_chart_context("Euro 2004")
+    assert ttl == app.FALLBACK_CACHE_TTL
+    assert context['ai_powered'] is False
+
+
+def test_build_chart_context_without_claude_uses_default_ttl(monkeypatch):
+    patch_analysis(monkeypatch, used_claude=False, configured=False)
+    context, ttl = app.build_chart_context("Euro 2004")
+    assert ttl is None
+    assert context['ai_powered'] is False
+    assert "Euro 2004" in context['insights'][0]
+
+
+def test_build_chart_context_passes_rate_limit_hook(monkeypatch):
+    calls = patch_analysis(monkeypatch)
+    hook = lambda: None
+    app.build_chart_context("Euro 2004", before_request=hook)
+    assert calls == [("Euro 2004", hook)]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    scheduler = PrewarmScheduler(app.build_chart_context)
+    monkeypatch.setattr(scheduler, "start", lambda: None)
+    monkeypatch.setattr(app, "scheduler", scheduler)
+    return app.app.test_client()
+
+
+def test_chart_fills_and_serves_from_cache(monkeypatch, client):
+    calls = patch_analysis(monkeypatch)
+
+    response = client.get("/chart?term=Euro 2004")
+    assert response.status_code == 200
+    assert len(calls) == 1
+
+    response = client.get("/chart?term=euro  2004")
+    assert response.status_code == 200
+    assert len(calls) == 1
+    assert 'Chart Result for "euro  2004"' in response.get_data(as_text=True)
+
+
+def test_chart_builds_with_first_spelling(monkeypatch, client):
+    calls = patch_analysis(monkeypatch, results={'error': "No results found for this search term."})
+
+    client.get("/chart?term=Euro 2004")
+    client.get("/chart?term=EURO 2004")
+    assert [term for term, _ in calls] == ["Euro 2004", "Euro 2004"]
@@ -0,0 +1,54 @@
+import requests
+
+import arquivo_scraper
+
+
+class FakeResponse:
+    def __init__(self, items):
+        self.items = items
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'response_items': self.items}
+
+
+def patch_requests(monkeypatch, failing_offsets=()):
+    urls = []
+
+    def get(url):
+        urls.append(url)
+        if any(f"offset={offset}&" in url for offset in failing_offsets):
+            raise requests.ConnectionError("connection reset")
+        return FakeResponse([{'title': "Euro 2004", 'tstamp': "20040615120000"}])
+
+    monkeypatch.setattr(arquivo_scraper.requests, "get", get)
+    return urls
+
+
+def test_fetch_calls_hook_before_every_request(monkeypatch):
+    urls = patch_requests(monkeypatch)
+    hook_calls = []
+
+    df = arquivo_scraper.fetch_arquivo_data("Euro 2004", max_results=300,
+                                            before_request=lambda: hook_calls.append(len(urls)))
+    assert len(urls) == 300 // arquivo_scraper.MAX_ITEMS_PER_REQUEST
+    assert hook_calls == [0, 1, 2]
+    assert df.attrs['failed_pages'] == 0
+    assert len(df) == 3
+
+
+def test_fetch_reports_failed_pages(monkeypatch):
+    patch_requests(monkeypatch, failing_offsets=(100,))
+    df = arquivo_scraper.fetch_arquivo_data("Euro 2004", max_results=300)
+    assert df.attrs['failed_pages'] == 1
+    assert len(df) == 2
+
+
+def test_analyze_exposes_failed_pages(monkeypatch):
+    patch_requests(monkeypatch, failing_offsets=(0, 200))
+    result = arquivo_scraper.analyze_search_term("Euro 2004", max_results=300)
+    assert result['failed_pages'] == 2
+    assert result['error'] is None
+    assert result['month_chart'] is not None
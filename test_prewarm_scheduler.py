@@ -0,0 +1,208 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import prewarm_scheduler
+from prewarm_scheduler import PrewarmScheduler, RateLimiter
+
+
+def make_scheduler(**kwargs):
+    """Create a scheduler whose build function records the terms it was called with"""
+    calls = []
+
+    def build(term, before_request=None):
+        calls.append(term)
+        if term == "missing":
+            return {'term': term, 'error': "No results found for this search term."}, 0
+        return {'term': term}, None
+
+    scheduler = PrewarmScheduler(build, arquivo_requests_per_minute=6000, **kwargs)
+    return scheduler, calls
+
+
+def test_off_peak_window():
+    scheduler, _ = make_scheduler(off_peak_hours=(1, 6))
+    assert scheduler.is_off_peak(datetime(2026, 1, 1, 1))
+    assert scheduler.is_off_peak(datetime(2026, 1, 1, 5))
+    assert not scheduler.is_off_peak(datetime(2026, 1, 1, 6))
+    assert not scheduler.is_off_peak(datetime(2026, 1, 1, 0))
+
+
+def test_off_peak_window_wraps_midnight():
+    scheduler, _ = make_scheduler(off_peak_hours=(22, 6))
+    assert scheduler.is_off_peak(datetime(2026, 1, 1, 23))
+    assert scheduler.is_off_peak(datetime(2026, 1, 1, 0))
+    assert scheduler.is_off_peak(datetime(2026, 1, 1, 3))
+    assert not scheduler.is_off_peak(datetime(2026, 1, 1, 6))
+    assert not scheduler.is_off_peak(datetime(2026, 1, 1, 12))
+
+
+def test_cache_entries_expire(monkeypatch):
+    scheduler, _ = make_scheduler(cache_ttl=100)
+    now = [1000.0]
+    monkeypatch.setattr(prewarm_scheduler.time, "time", lambda: now[0])
+
+    scheduler.put("a", {'term': "a"})
+    scheduler.put("b", {'term': "b"}, ttl=10)
+    now[0] += 50
+    assert scheduler.get("a") == {'term': "a"}
+    assert scheduler.get("b") is None
+    now[0] += 60
+    assert scheduler.get("a") is None
+
+
+def test_put_with_zero_ttl_is_not_cached():
+    scheduler, _ = make_scheduler()
+    scheduler.put("a", {'term': "a"}, ttl=0)
+    assert scheduler.get("a") is None
+
+
+def test_terms_are_normalised():
+    scheduler, _ = make_scheduler()
+    scheduler.record_request("Euro 2004")
+    scheduler.record_request("  euro   2004 ")
+    assert scheduler.trending_terms() == ["euro 2004"]
+
+    scheduler.put("Euro 2004", {'term': "Euro 2004"})
+    assert scheduler.get("EURO 2004") == {'term': "Euro 2004"}
+
+
+def test_eviction_keeps_least_recently_used_order():
+    scheduler, _ = make_scheduler(max_entries=2)
+    scheduler.put("a", {})
+    scheduler.put("b", {})
+    scheduler.get("a")
+    scheduler.put("c", {})
+    assert scheduler.get("b") is None
+    assert scheduler.get("a") is not None
+    assert scheduler.get("c") is not None
+
+
+def test_eviction_spares_tracked_and_trending_terms():
+    scheduler, _ = make_scheduler(tracked_terms=["a"], max_entries=2)
+    scheduler.record_request("b")
+    scheduler.run_once(force=True)
+
+    scheduler.put("x", {})
+    scheduler.put("y", {})
+    assert scheduler.get("a") is not None
+    assert scheduler.get("b") is not None
+    assert scheduler.get("x") is None
+    assert scheduler.get("y") is not None
+
+
+def test_request_counts_are_bounded_and_decay():
+    scheduler, _ = make_scheduler(max_counted_terms=10)
+    for _ in range(4):
+        scheduler.record_request("hot")
+    for i in range(20):
+        scheduler.record_request(f"once {i}")
+    assert len(scheduler.request_counts) <= 10
+    assert scheduler.request_counts["hot"] == 4
+
+    scheduler.decay_counts()
+    assert dict(scheduler.request_counts) == {"hot": 2}
+
+
+def test_terms_to_refresh_deduplicates_and_skips_in_flight():
+    scheduler, _ = make_scheduler(tracked_terms=["a", "b", "c"])
+    scheduler.record_request("a")
+    scheduler.record_request("d")
+    scheduler.in_flight.add("b")
+    scheduler.put("c", {})
+
+    assert sorted(scheduler.terms_to_refresh()) == ["a", "d"]
+
+
+def test_failed_terms_back_off():
+    scheduler, calls = make_scheduler(tracked_terms=["a", "missing"], retry_backoff=3600)
+    assert scheduler.run_once(force=True) == 1
+    assert sorted(calls) == ["a", "missing"]
+
+    assert scheduler.terms_to_refresh() == []
+    assert scheduler.run_once(force=True) == 0
+    assert len(calls) == 2
+
+
+def test_refresh_is_rate_limited_per_request():
+    limiter_calls = []
+
+    def build(term, before_request=None):
+        for _ in range(3):
+            before_request()
+        return {'term': term}, None
+
+    scheduler = PrewarmScheduler(build, tracked_terms=["a"])
+    scheduler.rate_limiter.acquire = lambda cost=1: limiter_calls.append(cost)
+    scheduler.run_once(force=True)
+    assert limiter_calls == [1, 1, 1]
+
+
+def test_run_once_respects_concurrency_budget():
+    active = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    def build(term, before_request=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return {'term': term}, None
+
+    scheduler = PrewarmScheduler(build, tracked_terms=["a", "b", "c", "d"], max_concurrency=2)
+    assert scheduler.run_once(force=True) == 4
+    assert peak[0] == 2
+
+
+def test_rate_limiter_caps_cost_at_capacity():
+    limiter = RateLimiter(60, burst=2)
+    start = time.monotonic()
+    limiter.acquire(cost=5)
+    assert time.monotonic() - start < 0.5
+    assert limiter.tokens < 1
+
+
+def test_rate_limiter_waits_for_tokens():
+    limiter = RateLimiter(600, burst=1)
+    start = time.monotonic()
+    limiter.acquire()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_expired_hot_terms_are_served_until_refreshed(monkeypatch):
+    scheduler, _ = make_scheduler(tracked_terms=["a"], cache_ttl=100)
+    now = [1000.0]
+    monkeypatch.setattr(prewarm_scheduler.time, "time", lambda: now[0])
+
+    scheduler.put("a", {'term': "a"})
+    scheduler.put("x", {'term': "x"})
+    now[0] += 200
+    assert scheduler.get("a") == {'term': "a"}
+    assert scheduler.get("x") is None
+
+
+def test_refresh_uses_first_spelling_seen():
+    scheduler, calls = make_scheduler(tracked_terms=["Euro 2004"])
+    scheduler.record_request("Benfica")
+    scheduler.record_request("BENFICA")
+    scheduler.run_once(force=True)
+
+    assert sorted(calls) == ["Benfica", "Euro 2004"]
+    assert scheduler.display_term("euro 2004") == "Euro 2004"
+    assert scheduler.get("benfica") == {'term': "Benfica"}
+
+
+def test_rate_limiter_defaults_to_small_burst():
+    limiter = RateLimiter(60)
+    assert limiter.capacity == 1
+
+
+def test_rate_limiter_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        RateLimiter(0)